@@ -6,25 +6,157 @@
 import argparse
 import json
 import logging
+import mmap
+import multiprocessing
 import os
+import queue
 import sys
+import threading
 import time
 import importlib.util
-import io
 from datetime import datetime
 from typing import Dict, Any, Optional, List, Tuple, Iterator
-from multiprocessing import Pool, Queue, Process, Manager
-from collections import defaultdict
-from queue import Empty
-import threading
+from multiprocessing import shared_memory
+from collections import Counter
 
 try:
     import pyarrow.parquet as pq
+    import pyarrow.compute as pc
     import pyarrow as pa
 except ImportError:
     pq = None
+    pc = None
     pa = None
 
+# Parquet 写出参数：字典编码 + zstd 压缩 + V2 数据页 + 列统计信息
+_PARQUET_WRITE_OPTIONS = {
+    "use_dictionary": True,
+    "compression": "zstd",
+    "data_page_version": "2.0",
+    "write_statistics": True,
+}
+# Parquet 输出的行组大小，足够大以便下游按统计信息做谓词下推
+_PARQUET_ROW_GROUP_SIZE = 1_000_000
+
+# 自动估算批大小：每批目标字节数、最小行数及 JSONL 采样字节数
+_TARGET_BATCH_BYTES = 4 * 1024 * 1024
+_MIN_BATCH_SIZE = 256
+_BATCH_SIZE_SAMPLE_BYTES = 1024 * 1024
+# JSONL 行边界扫描的采样字节数，用于估算平均行长
+_LINE_LENGTH_SAMPLE_BYTES = 64 * 1024
+# 行边界估计与实际行数相差超过该值时重新估计，否则逐行修正
+_LINE_SCAN_SLACK = 64
+# Parquet 读取批大小，与分发给工作进程的批大小解耦，读到后再切片
+_ARROW_READ_BATCH_SIZE = 65536
+# 每个工作进程预取的批次数，限制在途批次占用的内存
+_PREFETCH_PER_WORKER = 2
+# 两次写检查点之间的最短间隔（秒）
+_CHECKPOINT_INTERVAL = 5.0
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# JSON 编解码：优先使用 orjson（C 实现，直接处理 bytes），否则回退到标准库
+if orjson is not None:
+    _loads = orjson.loads
+    _DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+
+    def _dumps_line(obj: Any) -> bytes:
+        """序列化为一行 UTF-8 JSON（含换行符）"""
+        return orjson.dumps(obj, option=_DUMPS_OPTIONS)
+
+else:
+    _loads = json.loads
+    # 复用同一个编码器；json.dumps 带非默认参数时每次调用都会新建编码器
+    _encode = json.JSONEncoder(ensure_ascii=False).encode
+
+    def _dumps_line(obj: Any) -> bytes:
+        """序列化为一行 UTF-8 JSON（含换行符）"""
+        return (_encode(obj) + "\n").encode("utf-8")
+
+
+# 统计 mmap 区间内的换行数：mmap.count 需要 Python 3.13+，更早的版本复制该区间计数
+if hasattr(mmap.mmap, "count"):
+
+    def _count_newlines(mm, start: int, end: int) -> int:
+        return mm.count(b"\n", start, end)
+
+else:
+
+    def _count_newlines(mm, start: int, end: int) -> int:
+        return mm[start:end].count(b"\n")
+
+
+def _skip_lines(mm, pos: int, num_lines: int, avg_line_bytes: float) -> int:
+    """返回从 pos 起跳过 num_lines 行后的位置（不足时为文件末尾）
+
+    先按平均行长估计终点并用 count 统计其间的行数，偏差较大时在区间内按行
+    密度插值重新估计，最后用 find/rfind 逐行修正，Python 层只处理少数几行。
+    """
+    size = len(mm)
+    if num_lines <= 0:
+        return pos
+    end = min(size, pos + max(1, int(num_lines * avg_line_bytes)))
+    count = _count_newlines(mm, pos, end)
+
+    # Far off: search for the boundary within a shrinking [lo, hi] bracket,
+    # interpolating by line density but always cutting off at least 1/8
+    lo, lo_count = pos, 0
+    hi = hi_count = None
+    while True:
+        if count > num_lines + _LINE_SCAN_SLACK:
+            hi, hi_count = end, count
+        elif count < num_lines - _LINE_SCAN_SLACK and end < size:
+            lo, lo_count = end, count
+        else:
+            break
+        if hi is None:
+            line_bytes = (end - pos) / count if count else end - pos
+            new_end = min(size, lo + max(1, int((num_lines - lo_count) * line_bytes)))
+        else:
+            span = hi - lo
+            new_end = lo + int(span * (num_lines - lo_count) / (hi_count - lo_count))
+            new_end = max(lo + span // 8, min(hi - span // 8, new_end))
+        if new_end >= end:
+            count += _count_newlines(mm, end, new_end)
+        else:
+            count -= _count_newlines(mm, new_end, end)
+        end = new_end
+
+    # Align to a line boundary (keeps count), then walk the last few lines
+    newline = mm.rfind(b"\n", pos, end)
+    end = newline + 1 if newline >= 0 else pos
+    while count > num_lines:
+        newline = mm.rfind(b"\n", pos, end - 1)
+        end = newline + 1 if newline >= 0 else pos
+        count -= 1
+    while count < num_lines:
+        newline = mm.find(b"\n", end)
+        if newline < 0:
+            return size
+        end = newline + 1
+        count += 1
+    return end
+
+
+def _is_line_start(mm, pos: int) -> bool:
+    """pos 是否为文件内某一行的起始位置（文件开头或紧跟换行符）"""
+    return pos == 0 or (0 < pos <= len(mm) and mm[pos - 1] == ord("\n"))
+
+
+def _fadvise(f, advice_name: str):
+    """向内核提示文件访问模式；平台或文件不支持时忽略"""
+    advice = getattr(os, advice_name, None)
+    if advice is None:
+        return
+    try:
+        os.posix_fadvise(f.fileno(), 0, 0, advice)
+    except OSError:
+        pass
+
 
 def load_plugin_class(plugin_name: str, plugin_dir: str = None):
     """动态加载插件类
@@ -73,28 +205,678 @@ def load_plugin_class(plugin_name: str, plugin_dir: str = None):
         )
 
 
-def process_batch_worker(args):
-    """工作进程处理函数"""
-    batch, plugin_name, plugin_dir, output_paths, keep_order = args
+def _record_batch_to_shm(record_batch) -> str:
+    """将 RecordBatch 以 Arrow IPC 流格式写入共享内存，返回共享内存名称
+
+    先用 MockOutputStream 计算流大小，再直接写入共享内存，避免额外拷贝。
+    共享内存由读取方（工作进程）负责 unlink。
+    """
+    mock_sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(mock_sink, record_batch.schema) as writer:
+        writer.write_batch(record_batch)
+
+    shm = shared_memory.SharedMemory(create=True, size=mock_sink.size(), track=False)
+    try:
+        sink = pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf))
+        with pa.ipc.new_stream(sink, record_batch.schema) as writer:
+            writer.write_batch(record_batch)
+        sink.close()
+        # Writer and sink hold exports of shm.buf; drop them before closing
+        del writer, sink
+    except BaseException:
+        shm.unlink()
+        raise
+    shm.close()
+    return shm.name
+
+
+def _read_shm_batch(shm_name: str, start_idx: int) -> Tuple[list, int, int]:
+    """从共享内存读取 Arrow IPC 批次并处理，处理完成后释放共享内存"""
+    shm = shared_memory.SharedMemory(name=shm_name, track=False)
+    try:
+        reader = pa.ipc.open_stream(pa.py_buffer(shm.buf))
+        processed = _process_record_batch(reader.read_next_batch(), start_idx)
+        # Drop the zero-copy reader before closing the mapping
+        del reader
+    finally:
+        shm.close()
+        shm.unlink()
+    return processed
+
+
+class _ShmRing:
+    """JSONL 批次的共享内存环形槽位：主进程把原始行直接从 mmap 拷入空闲槽位，
+    经管道只传 (名称, 槽位, 偏移, 长度)，省去 bytes 的 pickle 与管道读写
+
+    共享内存开头每个槽位一个占用标记字节，主进程写入后置 1，工作进程取出数据后
+    清 0。槽位数不少于在途批次上限，因此取新批次时总有空闲槽位；放不下的批次
+    （超过槽位大小）返回 None，由调用方按原方式直接传 bytes。共享内存由主进程创建
+    和 unlink，工作进程只挂载。
+    """
+
+    def __init__(self, num_slots: int, slot_size: int):
+        self.num_slots = num_slots
+        self.slot_size = slot_size
+        # Keep slot data cache-line aligned after the flag bytes
+        self._header_size = -(-num_slots // 64) * 64
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=self._header_size + num_slots * slot_size, track=False
+        )
+
+    def put(self, data) -> Optional[tuple]:
+        """Copy data into a free slot; return the worker payload or None"""
+        size = len(data)
+        if size > self.slot_size:
+            return None
+        buf = self._shm.buf
+        slot = bytes(buf[: self.num_slots]).find(0)
+        if slot < 0:
+            return None
+        offset = self._header_size + slot * self.slot_size
+        buf[offset : offset + size] = data
+        buf[slot] = 1
+        return self._shm.name, slot, offset, size
+
+    def close(self):
+        """Close and unlink the shared memory"""
+        self._shm.close()
+        self._shm.unlink()
+
+
+def _read_ring_slot(ring_name: str, slot: int, offset: int, size: int) -> bytes:
+    """工作进程从环形槽位取出一个 JSONL 批次并释放槽位；共享内存挂载一次后复用"""
+    shm = _WORKER_RINGS.get(ring_name)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=ring_name, track=False)
+        _WORKER_RINGS[ring_name] = shm
+    buf = shm.buf
+    data = bytes(buf[offset : offset + size])
+    buf[slot] = 0
+    return data
+
+
+# 工作进程内常驻的插件实例及配置，由 _init_worker 在进程启动时初始化一次
+_WORKER_PLUGIN = None
+_WORKER_OUTPUT_PATHS = None
+_WORKER_FILE_TYPE = None
+_WORKER_SHARDED_OUTPUT = False
+_WORKER_COLUMN_TYPES = None
+_WORKER_RINGS = {}
+
+
+def _get_mp_context():
+    """获取多进程上下文：Linux 上使用 fork，子进程直接继承已导入的模块和插件类"""
+    if sys.platform == "linux":
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def _available_cpus() -> List[int]:
+    """当前进程可用的 CPU 编号（遵循 cgroup/taskset 限制）"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _pin_worker(cpu_counter):
+    """按启动顺序把工作进程绑定到不同的 CPU 上"""
+    if not hasattr(os, "sched_setaffinity"):
+        return
+    with cpu_counter.get_lock():
+        slot = cpu_counter.value
+        cpu_counter.value += 1
+    cpus = _available_cpus()
+    os.sched_setaffinity(0, {cpus[slot % len(cpus)]})
+
+
+def _init_worker(
+    plugin_name: str,
+    plugin_dir: str,
+    output_paths: List[str],
+    file_type: str,
+    sharded_output: bool = False,
+    plugin_class=None,
+    cpu_counter=None,
+    column_types=None,
+):
+    """工作进程初始化：加载并实例化插件，供后续所有批次复用
+
+    fork 模式下由父进程直接传入已加载的 plugin_class，无需在子进程中重新导入。
+    传入 cpu_counter（共享计数器）时将工作进程绑定到各自的 CPU。
+    column_types 用于分片输出时工作进程自行写出 Parquet 分片。
+    """
+    global _WORKER_PLUGIN, _WORKER_OUTPUT_PATHS, _WORKER_FILE_TYPE
+    global _WORKER_SHARDED_OUTPUT, _WORKER_COLUMN_TYPES
+
+    if cpu_counter is not None:
+        _pin_worker(cpu_counter)
+
+    if plugin_class is None:
+        plugin_class = load_plugin_class(plugin_name, plugin_dir)
+    _WORKER_PLUGIN = plugin_class()
+    _WORKER_OUTPUT_PATHS = output_paths
+    _WORKER_FILE_TYPE = file_type
+    _WORKER_SHARDED_OUTPUT = sharded_output
+    _WORKER_COLUMN_TYPES = column_types
 
-    plugin_class = load_plugin_class(plugin_name, plugin_dir)
-    plugin = plugin_class()
+
+def _parse_jsonl_lines(blob: bytes, start_idx: int) -> Tuple[list, list]:
+    """解析一批原始 JSONL 行，返回 ([(行号, 数据), ...], 解析告警)
+
+    无错误的批次整体解析，不进入逐行异常处理；有坏行时才逐行解析，
+    空行静默跳过，其余坏行记录告警交由主进程写入日志。
+    """
+    lines = blob.split(b"\n")
+    if not lines[-1]:
+        lines.pop()
+    try:
+        rows = list(zip(range(start_idx, start_idx + len(lines)), map(_loads, lines)))
+        return rows, []
+    except json.JSONDecodeError:
+        pass
+
+    rows = []
+    warnings = []
+    for idx, line in enumerate(lines, start_idx):
+        try:
+            rows.append((idx, _loads(line)))
+        except json.JSONDecodeError as e:
+            if line.strip():
+                warnings.append(f"JSON decode error at line {idx}: {e}")
+    return rows, warnings
+
+
+def _process_rows(rows: Iterator[Tuple[int, Dict[str, Any]]]) -> list:
+    """逐行调用插件的 single_line_process"""
+    plugin = _WORKER_PLUGIN
+    output_paths = _WORKER_OUTPUT_PATHS
     results = []
 
-    for idx, line_data in batch:
+    for idx, line_data in rows:
         try:
             result_data, output_idx = plugin.single_line_process(
                 line_data, output_paths
             )
             if result_data is not None and output_idx is not None:
-                if keep_order:
-                    results.append((idx, result_data, output_idx))
-                else:
-                    results.append((result_data, output_idx))
+                results.append((result_data, output_idx))
         except Exception as e:
             print(f"Error processing line {idx}: {e}")
 
-    return results, plugin.get_stats()
+    return results
+
+
+def _part_start(name: str) -> int:
+    """从 part-<起始行号>.<后缀> 文件名解析起始行号，无法解析时返回 -1"""
+    try:
+        return int(name[len("part-") :].split(".", 1)[0])
+    except ValueError:
+        return -1
+
+
+def _process_record_batch(record_batch, start_idx: int) -> Tuple[list, int, int]:
+    """处理 Arrow 批次：插件实现了 process_batch 时走向量化路径，否则逐行处理
+
+    返回 (各输出的数据块, 输入行数, 输出行数)。向量化路径全程保持列式，按输出序号
+    过滤出各输出的 Arrow 表，不经过 Python 字典。
+    """
+    process_batch = getattr(_WORKER_PLUGIN, "process_batch", None)
+    processed = None
+    if process_batch is not None:
+        try:
+            processed = process_batch(record_batch, _WORKER_OUTPUT_PATHS)
+        except Exception as e:
+            print(f"Error processing batch at line {start_idx}: {e}")
+
+    if processed is None:
+        results = _process_rows(enumerate(record_batch.to_pylist(), start_idx))
+        chunks = _group_results(results, record_batch.schema)
+        return chunks, record_batch.num_rows, len(results)
+
+    result_batch, output_indices = processed
+    chunks = []
+    num_output = 0
+    for output_idx in range(len(_WORKER_OUTPUT_PATHS)):
+        mask = pc.fill_null(pc.equal(output_indices, output_idx), False)
+        selected = result_batch.filter(mask)
+        num_output += selected.num_rows
+        chunks.append(pa.Table.from_batches([selected]) if selected.num_rows else None)
+    return chunks, record_batch.num_rows, num_output
+
+
+def _rows_to_table(rows: list, schema=None):
+    """将结果行转换为 Arrow 表
+
+    类型按本批数据推断；输入 schema 中已有的列改用输入列的类型，避免列类型随批次
+    漂移（如首个行组全为 null 或恰好都是整数）。插件改写为无法转换的值时保留推断类型。
+    """
+    table = pa.Table.from_pylist(rows)
+    if schema is None:
+        return table
+    for i, field in enumerate(table.schema):
+        j = schema.get_field_index(field.name)
+        if j < 0 or schema.field(j).type == field.type:
+            continue
+        type_ = schema.field(j).type
+        try:
+            column = table.column(i).cast(type_)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            continue
+        table = table.set_column(i, field.with_type(type_), column)
+    return table
+
+
+def _group_results(results: list, schema=None) -> list:
+    """按输出路径分组结果
+
+    JSONL 输出直接在工作进程中编码为 bytes；Parquet 输出转换为 Arrow 表，
+    没有数据的输出为 None。schema 为输入批次的 schema，用于确定输入列的输出类型。
+    """
+    num_outputs = len(_WORKER_OUTPUT_PATHS)
+    if _WORKER_FILE_TYPE == "jsonl":
+        chunks = [bytearray() for _ in range(num_outputs)]
+        for result_data, output_idx in results:
+            chunks[output_idx] += _dumps_line(result_data)
+        return chunks
+
+    records = [[] for _ in range(num_outputs)]
+    for result_data, output_idx in results:
+        records[output_idx].append(result_data)
+    return [_rows_to_table(rows, schema) if rows else None for rows in records]
+
+
+def _write_shards(chunks: list, start_idx: int):
+    """分片输出：将各输出的数据块写为 <输出目录>/part-<起始行号>.<类型>
+
+    文件名按起始行号补零，字典序即输入顺序；先写临时文件再重命名，
+    中断时不会留下不完整的分片。
+    """
+    for output_dir, chunk in zip(_WORKER_OUTPUT_PATHS, chunks):
+        if not chunk:
+            continue
+        part_name = f"part-{start_idx:012d}.{_WORKER_FILE_TYPE}"
+        part_path = os.path.join(output_dir, part_name)
+        tmp_path = os.path.join(output_dir, f".{part_name}.tmp")
+        if _WORKER_FILE_TYPE == "jsonl":
+            with open(tmp_path, "wb") as f:
+                f.write(chunk)
+        else:
+            pq.write_table(
+                _apply_column_types(chunk, _WORKER_COLUMN_TYPES),
+                tmp_path,
+                row_group_size=_PARQUET_ROW_GROUP_SIZE,
+                **_PARQUET_WRITE_OPTIONS,
+            )
+        os.replace(tmp_path, part_path)
+
+
+def process_batch_worker(task):
+    """工作进程处理函数
+
+    task 为 (批次序号, (起始行号, 数据))。JSONL 数据为原始行拼接的 bytes 或
+    环形共享内存槽位，在工作进程中并行解析；Parquet 数据为 RecordBatch 或共享
+    内存名称，在工作进程中才转换为 Python 字典，避免主进程逐行物化。
+
+    返回 (批次序号, 各输出的数据块, 增量统计, 输入行数, 输出行数, 告警)。数据块按输出路径分组
+    并保持批内输入顺序：JSONL 为已编码的 bytes，Parquet 为 Arrow 表，主进程只需
+    按批次序号依次写出；分片输出模式下由工作进程直接写分片文件，数据块为空。
+    插件实例跨批次复用，统计信息会累加，因此返回本批次的增量统计；插件声明了
+    STATS_FIELDS 时增量统计为按字段顺序排列的元组。
+    """
+    seq, batch = task
+    plugin = _WORKER_PLUGIN
+    stats_fields = getattr(plugin, "STATS_FIELDS", ())
+    stats = plugin.get_stats()
+    if stats_fields:
+        stats_before = [stats.get(key, 0) for key in stats_fields]
+    else:
+        stats_before = dict(stats)
+
+    warnings = []
+    start_idx, payload = batch
+    if isinstance(payload, tuple):
+        payload = _read_ring_slot(*payload)
+    if isinstance(payload, bytes):
+        rows, warnings = _parse_jsonl_lines(payload, start_idx)
+        results = _process_rows(rows)
+        chunks, num_input, num_output = _group_results(results), len(rows), len(results)
+    elif isinstance(payload, str):
+        chunks, num_input, num_output = _read_shm_batch(payload, start_idx)
+    else:
+        chunks, num_input, num_output = _process_record_batch(payload, start_idx)
+
+    if _WORKER_SHARDED_OUTPUT:
+        # Written here directly; nothing goes back to the parent
+        _write_shards(chunks, start_idx)
+        chunks = []
+
+    stats = plugin.get_stats()
+    if stats_fields:
+        batch_stats = tuple(
+            stats.get(key, 0) - before
+            for key, before in zip(stats_fields, stats_before)
+        )
+    else:
+        batch_stats = {}
+        for key, value in stats.items():
+            if isinstance(value, (int, float)):
+                batch_stats[key] = value - stats_before.get(key, 0)
+            else:
+                batch_stats[key] = value
+    return seq, chunks, batch_stats, num_input, num_output, warnings
+
+
+def _imap_bounded(pool, func, tasks: Iterator, max_pending: int) -> Iterator:
+    """按完成顺序返回 func(task) 的结果，同时在途任务数不超过 max_pending
+
+    Pool.imap_unordered 会在后台线程中尽快取完整个任务迭代器，读取快于处理时
+    在途批次（及共享内存块）会无限堆积；这里只在有任务完成后才继续取任务。
+    """
+    done = queue.SimpleQueue()
+    tasks = iter(tasks)
+    num_pending = 0
+    exhausted = False
+    while True:
+        while not exhausted and num_pending < max_pending:
+            try:
+                task = next(tasks)
+            except StopIteration:
+                exhausted = True
+                break
+            pool.apply_async(func, (task,), callback=done.put, error_callback=done.put)
+            num_pending += 1
+        if num_pending == 0:
+            return
+        result = done.get()
+        num_pending -= 1
+        if isinstance(result, BaseException):
+            raise result
+        yield result
+
+
+class _BatchCursor:
+    """包装批次迭代器，为批次编号并记录起始行号；按完成情况推进检查点游标
+
+    line 为"之前所有批次均已完成"的行号：乱序完成时只推进到最小的未完成批次，
+    后续批次尚未派发、起始行号未知时保持不变。offsets 为批次迭代器填写的
+    起始行号 -> 字节偏移，已完成批次的条目随之删除。shm_names 为批次迭代器填写的
+    起始行号 -> 共享内存名称，批次结果返回（工作进程已释放共享内存）时即删除。
+    """
+
+    def __init__(
+        self,
+        batches: Iterator,
+        start_line: int,
+        offsets: Optional[dict] = None,
+        shm_names: Optional[dict] = None,
+    ):
+        self._batches = batches
+        self._starts = {}
+        self._done = set()
+        self._next_seq = 0
+        self._offsets = offsets
+        self._shm_names = shm_names
+        self.line = start_line
+
+    @property
+    def offset(self) -> Optional[int]:
+        """Byte offset of line in the input, if the batch source records it"""
+        if self._offsets is None:
+            return None
+        return self._offsets.get(self.line)
+
+    def __iter__(self):
+        for seq, batch in enumerate(self._batches):
+            self._starts[seq] = batch[0]
+            yield seq, batch
+
+    def returned(self, seq: int):
+        """Forget the shared memory of a batch whose worker has released it"""
+        if self._shm_names is not None:
+            self._shm_names.pop(self._starts[seq], None)
+
+    def complete(self, seq: int):
+        """Mark a batch finished and advance past the completed prefix"""
+        self._done.add(seq)
+        while self._next_seq in self._done:
+            self._done.remove(self._next_seq)
+            start = self._starts.pop(self._next_seq)
+            if self._offsets is not None:
+                self._offsets.pop(start, None)
+            self._next_seq += 1
+        line = self._starts.get(self._next_seq)
+        if line is not None:
+            self.line = line
+
+
+# 单次 writev 最多提交的缓冲区个数
+_IOV_MAX = os.sysconf("SC_IOV_MAX") if hasattr(os, "sysconf") else 1024
+
+
+def _write_buffers(fd: int, buffers: list):
+    """把多个缓冲区依次写入文件描述符：有 writev 时一次系统调用提交多个，处理部分写入"""
+    views = [memoryview(buf) for buf in buffers]
+    start = 0
+    while start < len(views):
+        if hasattr(os, "writev"):
+            written = os.writev(fd, views[start : start + _IOV_MAX])
+        else:
+            written = os.write(fd, views[start])
+        # Drop fully written buffers, trim a partially written one
+        while start < len(views) and written >= len(views[start]):
+            written -= len(views[start])
+            start += 1
+        if written:
+            views[start] = views[start][written:]
+
+
+class _JsonlWriter:
+    """JSONL 输出：各批次编码好的数据块先挂在列表中，累计达到阈值后用 writev 一次写出
+
+    数据块不再拷贝进中间缓冲区，文件以无缓冲方式打开。
+    """
+
+    def __init__(self, path: str, flush_size: int):
+        self._file = open(path, "wb", buffering=0)
+        self._chunks = []
+        self._pending_bytes = 0
+        self._flush_size = flush_size
+
+    def write_chunk(self, chunk: bytes):
+        """Append already-encoded JSONL lines"""
+        self._chunks.append(chunk)
+        self._pending_bytes += len(chunk)
+        if self._pending_bytes >= self._flush_size:
+            self.flush()
+
+    def flush(self):
+        """Write pending chunks to the file"""
+        if self._chunks:
+            _write_buffers(self._file.fileno(), self._chunks)
+            self._chunks = []
+            self._pending_bytes = 0
+
+    def close(self):
+        """Flush and close the file"""
+        try:
+            self.flush()
+        finally:
+            self._file.close()
+
+
+def parse_column_types(spec: str) -> Dict[str, str]:
+    """解析 "score:int32,value:float32" 形式的列类型说明"""
+    column_types = {}
+    for item in spec.split(","):
+        name, sep, type_name = item.strip().rpartition(":")
+        if not sep or not name or not type_name:
+            raise ValueError(f"Invalid column type spec: {item!r}")
+        column_types[name] = type_name
+    return column_types
+
+
+def _resolve_column_types(column_types: Dict[str, Any]) -> Dict[str, Any]:
+    """将类型名（如 "float32"）解析为 Arrow 类型，已是 DataType 的原样保留"""
+    resolved = {}
+    for name, type_ in column_types.items():
+        if isinstance(type_, str):
+            try:
+                type_ = pa.type_for_alias(type_)
+            except ValueError:
+                raise ValueError(
+                    f"Unknown Arrow type {type_!r} for column {name!r}"
+                ) from None
+        resolved[name] = type_
+    return resolved
+
+
+def _apply_column_types(table, column_types: Optional[Dict[str, Any]]):
+    """按指定类型转换表中已有的列（如 float64 -> float32 降精度）
+
+    整数转换为安全转换，越界时抛出 ArrowInvalid 而不是静默截断。
+    """
+    if not column_types:
+        return table
+    schema = table.schema
+    changed = False
+    for i, field in enumerate(schema):
+        type_ = column_types.get(field.name)
+        if type_ is not None and type_ != field.type:
+            schema = schema.set(i, field.with_type(type_))
+            changed = True
+    return table.cast(schema) if changed else table
+
+
+class _ParquetWriter:
+    """Parquet 输出：流式写入，累积到一个行组大小后写出，内存占用与行组成正比
+
+    文件 schema 由第一次写出的数据确定（column_types 中的列按指定类型覆盖），
+    之后的数据按该 schema 对齐（缺失列补 null，类型做安全转换）。
+    没有任何数据时不生成文件。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        row_group_size: int = _PARQUET_ROW_GROUP_SIZE,
+        column_types: Optional[Dict[str, Any]] = None,
+    ):
+        self._path = path
+        self._row_group_size = row_group_size
+        self._column_types = column_types
+        self._writer = None
+        self._schema = None
+        self._pending = []
+        self._pending_rows = 0
+
+    def write_chunk(self, chunk):
+        """Append an Arrow table"""
+        self._pending.append(chunk)
+        self._pending_rows += chunk.num_rows
+        if self._pending_rows >= self._row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Write pending tables as one or more row groups"""
+        if not self._pending:
+            return
+        table = pa.concat_tables(self._pending, promote_options="permissive")
+        self._pending = []
+        self._pending_rows = 0
+
+        if self._writer is None:
+            table = _apply_column_types(table, self._column_types)
+            self._schema = table.schema
+            self._writer = pq.ParquetWriter(
+                self._path, self._schema, **_PARQUET_WRITE_OPTIONS
+            )
+        else:
+            table = self._conform(table)
+        self._writer.write_table(table, row_group_size=self._row_group_size)
+
+    def _conform(self, table):
+        """Align a table to the file schema"""
+        schema = self._schema
+        extra = set(table.column_names) - set(schema.names)
+        if extra:
+            raise ValueError(
+                f"Columns {sorted(extra)} not in output schema of {self._path}"
+            )
+        columns = []
+        for field in schema:
+            if field.name not in table.column_names:
+                columns.append(pa.nulls(table.num_rows, field.type))
+                continue
+            column = table.column(field.name)
+            if column.type != field.type:
+                try:
+                    column = column.cast(field.type)
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                    raise ValueError(
+                        f"Column {field.name!r} of {self._path} was written as "
+                        f"{field.type} but a later row group has {column.type} "
+                        f"values; pin its type with --column-types "
+                        f"{field.name}:<type> (column_types=...)"
+                    ) from e
+            columns.append(column)
+        return pa.Table.from_arrays(columns, schema=schema)
+
+    def close(self):
+        """Flush and close the file"""
+        try:
+            self.flush()
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+class _OutputThread:
+    """后台写出线程：结果循环只负责入队，编码后数据的写盘与 Parquet 压缩在此完成
+
+    队列有界，写出跟不上时对结果循环形成背压；单线程按入队顺序写出，
+    保持批次顺序。写出出错后继续取空队列，错误在下次提交或关闭时抛出。
+    """
+
+    def __init__(self, writers: list, maxsize: int):
+        self._writers = writers
+        self._queue = queue.Queue(maxsize)
+        self._error = None
+        self._error_raised = False
+        self._thread = threading.Thread(
+            target=self._run, name="output-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, chunks: list):
+        """Queue one batch's per-output chunks for writing"""
+        self._raise_error()
+        self._queue.put(chunks)
+
+    def _run(self):
+        while True:
+            chunks = self._queue.get()
+            if chunks is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                # Skip empty chunks (b"" / None)
+                for writer, chunk in zip(self._writers, chunks):
+                    if chunk:
+                        writer.write_chunk(chunk)
+            except BaseException as e:
+                self._error = e
+
+    def _raise_error(self):
+        if self._error is not None and not self._error_raised:
+            self._error_raised = True
+            raise self._error
+
+    def close(self):
+        """Wait for queued chunks to be written"""
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
 
 
 class DataProcessor:
@@ -107,22 +889,35 @@ class DataProcessor:
         stats_path: str,
         plugin_name: str,
         file_type: str,
-        num_workers: int = 4,
+        num_workers: Optional[int] = None,
         keep_order: bool = False,
         plugin_dir: str = None,
-        batch_size: int = 1000,
+        batch_size: Optional[int] = None,
         write_buffer_size: int = 8 * 1024 * 1024,  # 8MB write buffer
+        use_shared_memory: bool = False,
+        sharded_output: bool = False,
+        pin_workers: bool = False,
+        row_group_size: int = _PARQUET_ROW_GROUP_SIZE,
+        arrow_batch_size: int = _ARROW_READ_BATCH_SIZE,
+        column_types: Optional[Dict[str, Any]] = None,
     ):
         self.input_path = input_path
         self.output_paths = output_paths
         self.stats_path = stats_path
         self.plugin_name = plugin_name
         self.file_type = file_type.lower()
-        self.num_workers = num_workers
+        # Default to one worker per CPU this process may run on
+        self.num_workers = num_workers or len(_available_cpus())
         self.keep_order = keep_order
         self.plugin_dir = plugin_dir
         self.batch_size = batch_size
         self.write_buffer_size = write_buffer_size
+        self.use_shared_memory = use_shared_memory
+        self.sharded_output = sharded_output
+        self.pin_workers = pin_workers
+        # Parquet outputs buffer at most one row group per path before writing
+        self.row_group_size = row_group_size
+        self.arrow_batch_size = arrow_batch_size
 
         # Validate file type
         if self.file_type not in ["jsonl", "parquet"]:
@@ -131,9 +926,17 @@ class DataProcessor:
         if self.file_type == "parquet" and pq is None:
             raise ImportError("pyarrow required for parquet: pip install pyarrow")
 
-        # Create output directories
+        # Narrower output column types for parquet, e.g. {"value": "float32"}
+        self.column_types = None
+        if column_types:
+            if self.file_type != "parquet":
+                raise ValueError("column_types only applies to parquet output")
+            self.column_types = _resolve_column_types(column_types)
+
+        # Create output directories (each output is itself a directory of parts
+        # when sharded)
         for output_path in output_paths:
-            dir_name = os.path.dirname(output_path)
+            dir_name = output_path if sharded_output else os.path.dirname(output_path)
             if dir_name:
                 os.makedirs(dir_name, exist_ok=True)
 
@@ -149,11 +952,63 @@ class DataProcessor:
         self._setup_logger(log_filename)
 
         # Verify plugin exists
-        load_plugin_class(plugin_name, plugin_dir)
+        self._plugin_class = load_plugin_class(plugin_name, plugin_dir)
+        self._stats_fields = getattr(self._plugin_class, "STATS_FIELDS", ())
+        self._mp_context = _get_mp_context()
+
+        # Size batches by a byte budget when no explicit batch size is given
+        if self.batch_size is None:
+            self.batch_size = self._estimate_batch_size()
 
         # Checkpoint file
         self.checkpoint_file = f"{output_paths[0]}.checkpoint"
 
+    def _worker_initargs(self) -> tuple:
+        """Build pool initializer args; forked workers inherit the plugin class"""
+        plugin_class = None
+        if self._mp_context.get_start_method() == "fork":
+            plugin_class = self._plugin_class
+        cpu_counter = None
+        if self.pin_workers:
+            cpu_counter = self._mp_context.Value("i", 0)
+        return (
+            self.plugin_name,
+            self.plugin_dir,
+            self.output_paths,
+            self.file_type,
+            self.sharded_output,
+            plugin_class,
+            cpu_counter,
+            self.column_types,
+        )
+
+    def _estimate_batch_size(self) -> int:
+        """Estimate rows per batch so each batch carries ~_TARGET_BATCH_BYTES
+
+        Also caps the size so every worker gets several batches on small inputs.
+        """
+        if self.file_type == "parquet":
+            metadata = pq.ParquetFile(self.input_path).metadata
+            total_rows = metadata.num_rows
+            total_bytes = sum(
+                metadata.row_group(i).total_byte_size
+                for i in range(metadata.num_row_groups)
+            )
+            avg_row_bytes = total_bytes / total_rows if total_rows else 1
+        else:
+            with open(self.input_path, "rb") as f:
+                sample = f.read(_BATCH_SIZE_SAMPLE_BYTES)
+            avg_row_bytes = len(sample) / max(1, sample.count(b"\n"))
+            total_rows = os.path.getsize(self.input_path) / max(1, avg_row_bytes)
+
+        batch_size = int(_TARGET_BATCH_BYTES // max(1, avg_row_bytes))
+        batch_size = min(batch_size, int(total_rows // (self.num_workers * 4)))
+        batch_size = max(_MIN_BATCH_SIZE, batch_size)
+        self.logger.info(
+            f"Auto batch size: {batch_size} (~{avg_row_bytes:.0f} bytes/row)"
+        )
+        return batch_size
+
     def _setup_logger(self, log_filename: str):
         """Setup logger"""
         self.logger = logging.getLogger("DataProcessor")
@@ -174,58 +1029,181 @@ class DataProcessor:
         self.logger.addHandler(ch)
         self.logger.info(f"Log file: {log_filename}")
 
-    def _write_checkpoint(self, line_number: int):
-        """Write checkpoint"""
+    def _write_checkpoint(self, line_number: int, byte_offset: Optional[int] = None):
+        """Write checkpoint atomically: write a temp file, then rename over
+
+        JSONL checkpoints also record the byte offset of line_number so that a
+        resume can seek straight to it.
+        """
+        tmp_file = f"{self.checkpoint_file}.tmp"
+        if byte_offset is None:
+            content = f"{line_number}\n"
+        else:
+            content = f"{line_number},{byte_offset}\n"
         try:
-            with open(self.checkpoint_file, "w") as f:
-                f.write(str(line_number))
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                os.write(fd, content.encode())
+                # Make the contents durable before the rename publishes them
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            # Readers see either the old or the new checkpoint, never a torn one
+            os.replace(tmp_file, self.checkpoint_file)
         except Exception as e:
             self.logger.error(f"Failed to write checkpoint: {e}")
 
-    def _iter_jsonl(self, start_line: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
-        """Stream read JSONL file with buffering"""
-        with open(
-            self.input_path, "r", encoding="utf-8", buffering=8 * 1024 * 1024
-        ) as f:
-            for idx, line in enumerate(f):
-                if idx < start_line:
-                    continue
-                line = line.strip()
-                if line:
-                    try:
-                        yield idx, json.loads(line)
-                    except json.JSONDecodeError as e:
-                        self.logger.warning(f"JSON decode error at line {idx}: {e}")
-
-    def _iter_parquet(
-        self, start_line: int = 0
-    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
-        """Stream read Parquet file in batches"""
-        parquet_file = pq.ParquetFile(self.input_path)
-        idx = 0
-        for batch in parquet_file.iter_batches(batch_size=self.batch_size):
-            for row in batch.to_pylist():
-                if idx >= start_line:
-                    yield idx, row
-                idx += 1
-
-    def _iter_data(self, start_line: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
-        """Stream data iterator"""
+    def _advance_checkpoint(self, cursor: _BatchCursor, seq: int):
+        """Record a written batch; persist the cursor at most every few seconds
+
+        Only sharded output is checkpointed: part files are renamed into place
+        atomically and kept on resume, whereas single-file outputs are rewritten
+        from the start, so a checkpoint would skip rows whose output was lost.
+        """
+        cursor.complete(seq)
+        if not self.sharded_output or cursor.line <= self._checkpoint_line:
+            return
+        now = time.monotonic()
+        if now - self._last_checkpoint_time >= _CHECKPOINT_INTERVAL:
+            self._write_checkpoint(cursor.line, cursor.offset)
+            self._checkpoint_line = cursor.line
+            self._last_checkpoint_time = now
+
+    def _remove_checkpoint(self):
+        """Drop the checkpoint after a complete run so a rerun starts over"""
+        try:
+            os.remove(self.checkpoint_file)
+        except FileNotFoundError:
+            pass
+
+    def _iter_jsonl_batches(
+        self, start_line: int = 0, start_offset: Optional[int] = None
+    ) -> Iterator[Tuple[int, Any]]:
+        """Stream raw JSONL lines as (start_idx, bytes) batches; workers parse them
+
+        The file is memory-mapped and batch boundaries are located with C-level
+        newline scans, so the parent never splits the input into line objects.
+        With shared memory enabled, batches are copied from the mapping straight
+        into a ring slot and only the slot reference is yielded.
+
+        start_offset, the byte offset of start_line from a checkpoint, is used
+        directly when it falls on a line boundary; otherwise the lines are
+        skipped. The start offset of each batch is recorded in
+        self._batch_offsets for checkpointing.
+        """
+        batch_size = self.batch_size
+        with open(self.input_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                sample_end = min(size, _LINE_LENGTH_SAMPLE_BYTES)
+                sample_lines = _count_newlines(mm, 0, sample_end)
+                avg_line_bytes = sample_end / max(1, sample_lines)
+
+                if start_offset is not None and _is_line_start(mm, start_offset):
+                    pos = start_offset
+                else:
+                    pos = _skip_lines(mm, 0, start_line, avg_line_bytes)
+                idx = start_line
+                while pos < size:
+                    end = _skip_lines(mm, pos, batch_size, avg_line_bytes)
+                    self._batch_offsets[idx] = pos
+                    yield idx, self._jsonl_payload(mm, pos, end)
+                    # Adapt the line length estimate to the data just read
+                    avg_line_bytes = (end - pos) / batch_size
+                    idx += batch_size
+                    pos = end
+            # Drop the consumed pages from the page cache
+            _fadvise(f, "POSIX_FADV_DONTNEED")
+
+    def _jsonl_payload(self, mm, pos: int, end: int):
+        """Place one JSONL batch in the shared memory ring, or return its bytes"""
+        if not self.use_shared_memory:
+            return mm[pos:end]
+        if self._shm_ring is None:
+            # Slots fit twice the first batch; larger batches fall back to bytes
+            self._shm_ring = _ShmRing(
+                _PREFETCH_PER_WORKER * self.num_workers,
+                max(2 * (end - pos), _LINE_LENGTH_SAMPLE_BYTES),
+            )
+        with memoryview(mm) as view:
+            payload = self._shm_ring.put(view[pos:end])
+        return payload if payload is not None else mm[pos:end]
+
+    def _iter_parquet_batches(
+        self, start_line: int = 0, compact: bool = False
+    ) -> Iterator[Tuple[int, Any]]:
+        """Stream Parquet file as (start_idx, RecordBatch) without row materialization
+
+        Reads large Arrow batches and carves dispatch-sized slices out of them.
+        Slices share the parent's buffers, and pickling one serializes those
+        buffers whole, so compact=True copies partial slices into their own.
+        """
+        batch_size = self.batch_size
+        read_size = max(batch_size, self.arrow_batch_size)
+        # Memory-map the input so pages are faulted in on demand without copies,
+        # and coalesce column chunk reads per row group
+        with pq.ParquetFile(
+            self.input_path, memory_map=True, pre_buffer=True
+        ) as parquet_file:
+            # On resume, skip whole row groups before start_line without reading
+            metadata = parquet_file.metadata
+            idx = 0
+            first_group = 0
+            while (
+                first_group < metadata.num_row_groups
+                and idx + metadata.row_group(first_group).num_rows <= start_line
+            ):
+                idx += metadata.row_group(first_group).num_rows
+                first_group += 1
+            for batch in parquet_file.iter_batches(
+                batch_size=read_size,
+                row_groups=range(first_group, metadata.num_row_groups),
+                use_threads=True,
+            ):
+                num_rows = batch.num_rows
+                for offset in range(max(0, start_line - idx), num_rows, batch_size):
+                    sub_batch = batch.slice(offset, batch_size)
+                    if compact and sub_batch.num_rows < num_rows:
+                        sub_batch = pa.concat_batches([sub_batch])
+                    yield idx + offset, sub_batch
+                idx += num_rows
+
+    def _iter_batches(
+        self, start_line: int = 0, start_offset: Optional[int] = None
+    ) -> Iterator:
+        """Stream batches ready to be dispatched to workers"""
         if self.file_type == "jsonl":
-            yield from self._iter_jsonl(start_line)
+            yield from self._iter_jsonl_batches(start_line, start_offset)
         elif self.file_type == "parquet":
-            yield from self._iter_parquet(start_line)
-
-    def _create_batches(self, data_iter: Iterator, batch_size: int) -> Iterator[List]:
-        """Create batches from iterator"""
-        batch = []
-        for item in data_iter:
-            batch.append(item)
-            if len(batch) >= batch_size:
-                yield batch
-                batch = []
-        if batch:
-            yield batch
+            if self.use_shared_memory:
+                # Hand workers only a shared memory name instead of pickled data
+                for start_idx, record_batch in self._iter_parquet_batches(start_line):
+                    shm_name = _record_batch_to_shm(record_batch)
+                    self._shm_names[start_idx] = shm_name
+                    yield start_idx, shm_name
+            else:
+                yield from self._iter_parquet_batches(start_line, compact=True)
+
+    def _release_shared_memory(self):
+        """Unlink shared memory blocks that were never consumed by a worker"""
+        for shm_name in self._shm_names.values():
+            try:
+                shm = shared_memory.SharedMemory(name=shm_name, track=False)
+            except FileNotFoundError:
+                continue
+            shm.close()
+            shm.unlink()
+        self._shm_names.clear()
+
+    def _close_shm_ring(self):
+        """Unlink the JSONL shared memory ring once no worker can still read it"""
+        if self._shm_ring is not None:
+            self._shm_ring.close()
+            self._shm_ring = None
 
     def process(self):
         """Execute data processing"""
@@ -239,56 +1217,76 @@ class DataProcessor:
         self.logger.info(f"Workers: {self.num_workers}")
         self.logger.info(f"Keep order: {self.keep_order}")
         self.logger.info(f"Batch size: {self.batch_size}")
+        self.logger.info(f"Shared memory: {self.use_shared_memory}")
+        self.logger.info(f"Sharded output: {self.sharded_output}")
+        self.logger.info(f"Pin workers: {self.pin_workers}")
         self.logger.info("=" * 60)
 
-        checkpoint = self._read_checkpoint()
+        checkpoint, checkpoint_offset = self._read_checkpoint()
+        self._checkpoint_line = checkpoint
+        self._batch_offsets = {}
+        self._last_checkpoint_time = time.monotonic()
         start_time = time.time()
+        self._shm_names = {}  # start line -> shared memory name, until returned
+        self._shm_ring = None
 
         # Open all output files at once with buffering
         output_files = []
+        output = None
         try:
-            for path in self.output_paths:
-                if self.file_type == "jsonl":
-                    f = open(
-                        path, "w", encoding="utf-8", buffering=self.write_buffer_size
-                    )
-                    output_files.append(f)
-                else:
-                    # For parquet, we collect data and write at end
-                    output_files.append([])  # List to collect data
-
-            combined_stats = defaultdict(int)
-            total_processed = 0
-            total_output = 0
-            last_log_time = start_time
-
-            if self.keep_order:
-                self._process_ordered(
-                    output_files,
-                    combined_stats,
-                    checkpoint,
-                    start_time,
-                    lambda: time.time(),
-                )
+            if self.sharded_output:
+                # Workers write part files themselves; no writers in the parent
+                self._prepare_shard_dirs(checkpoint)
             else:
-                self._process_unordered(
-                    output_files,
+                for path in self.output_paths:
+                    if self.file_type == "jsonl":
+                        writer = _JsonlWriter(path, self.write_buffer_size)
+                    else:
+                        writer = _ParquetWriter(
+                            path, self.row_group_size, self.column_types
+                        )
+                    output_files.append(writer)
+
+            combined_stats = Counter()
+
+            with self._mp_context.Pool(
+                processes=self.num_workers,
+                initializer=_init_worker,
+                initargs=self._worker_initargs(),
+            ) as pool:
+                # Start the writer thread only after the workers are forked:
+                # forking a multi-threaded parent can leave locks held in children
+                output = _OutputThread(output_files, 4 * self.num_workers)
+
+                process_loop = (
+                    self._process_ordered
+                    if self.keep_order
+                    else self._process_unordered
+                )
+                process_loop(
+                    pool,
+                    output,
                     combined_stats,
                     checkpoint,
+                    checkpoint_offset,
                     start_time,
                     lambda: time.time(),
                 )
 
+        except BaseException:
+            self._release_shared_memory()
+            raise
         finally:
-            # Close all output files
-            for i, f in enumerate(output_files):
-                if self.file_type == "jsonl" and hasattr(f, "close"):
+            try:
+                if output is not None:
+                    output.close()
+            finally:
+                # Close all output files
+                for f in output_files:
                     f.close()
-                elif self.file_type == "parquet" and isinstance(f, list) and f:
-                    # Write parquet data
-                    table = pa.Table.from_pylist(f)
-                    pq.write_table(table, self.output_paths[i])
+                self._close_shm_ring()
 
+        self._remove_checkpoint()
         elapsed = time.time() - start_time
         self._write_stats(dict(combined_stats), elapsed)
         self.logger.info("=" * 60)
@@ -297,152 +1295,184 @@ class DataProcessor:
         self.logger.info("=" * 60)
 
     def _process_unordered(
-        self, output_files, combined_stats, checkpoint, start_time, get_time
+        self,
+        pool,
+        output,
+        combined_stats,
+        checkpoint,
+        checkpoint_offset,
+        start_time,
+        get_time,
     ):
         """Process without maintaining order - faster"""
-        data_iter = self._iter_data(checkpoint)
-        batch_iter = self._create_batches(data_iter, self.batch_size)
+        cursor = _BatchCursor(
+            self._iter_batches(checkpoint, checkpoint_offset),
+            checkpoint,
+            self._batch_offsets,
+            self._shm_names,
+        )
 
         total_processed = 0
         total_output = 0
         last_log_time = start_time
         last_processed = 0
 
-        # Prepare batches with metadata
-        def batch_with_args():
-            for batch in batch_iter:
-                yield (
-                    batch,
-                    self.plugin_name,
-                    self.plugin_dir,
-                    self.output_paths,
-                    False,
+        for (
+            seq,
+            chunks,
+            batch_stats,
+            num_input,
+            num_output,
+            warnings,
+        ) in _imap_bounded(
+            pool,
+            process_batch_worker,
+            cursor,
+            _PREFETCH_PER_WORKER * self.num_workers,
+        ):
+            cursor.returned(seq)
+            # Hand results to the writer thread immediately
+            output.submit(chunks)
+            total_output += num_output
+            self._advance_checkpoint(cursor, seq)
+
+            total_processed += num_input
+
+            self._merge_stats(combined_stats, batch_stats)
+            for message in warnings:
+                self.logger.warning(message)
+
+            # Log every 10 seconds
+            current_time = get_time()
+            if current_time - last_log_time >= 10:
+                speed = (total_processed - last_processed) / (
+                    current_time - last_log_time
                 )
-
-        with Pool(processes=self.num_workers) as pool:
-            for results, batch_stats in pool.imap_unordered(
-                process_batch_worker, batch_with_args()
-            ):
-                # Write results immediately
-                for result_data, output_idx in results:
-                    if self.file_type == "jsonl":
-                        output_files[output_idx].write(
-                            json.dumps(result_data, ensure_ascii=False) + "\n"
-                        )
-                    else:
-                        output_files[output_idx].append(result_data)
-                    total_output += 1
-
-                total_processed += self.batch_size
-
-                # Update stats
-                for key, value in batch_stats.items():
-                    if isinstance(value, (int, float)):
-                        combined_stats[key] += value
-
-                # Log every 10 seconds
-                current_time = get_time()
-                if current_time - last_log_time >= 10:
-                    speed = (total_processed - last_processed) / (
-                        current_time - last_log_time
-                    )
-                    self.logger.info(
-                        f"Speed: {speed:.0f} rows/s | Processed: {total_processed} | Output: {total_output}"
-                    )
-                    last_log_time = current_time
-                    last_processed = total_processed
+                self.logger.info(
+                    f"Speed: {speed:.0f} rows/s | Processed: {total_processed} | Output: {total_output}"
+                )
+                last_log_time = current_time
+                last_processed = total_processed
 
         combined_stats["total_processed"] = total_processed
         combined_stats["total_output"] = total_output
 
-    def _read_checkpoint(self) -> int:
-        """Read checkpoint, return processed line count"""
+    def _prepare_shard_dirs(self, checkpoint: int):
+        """Remove parts left by an earlier run that the new run will rewrite
+
+        When resuming, parts starting before the checkpoint are kept. Parts at
+        or after it are removed even if complete: the batch size may differ
+        between runs, so the new parts need not replace them name for name.
+        """
+        for output_dir in self.output_paths:
+            for name in os.listdir(output_dir):
+                is_tmp = name.startswith(".part-") and name.endswith(".tmp")
+                is_part = name.startswith("part-")
+                if is_tmp or (
+                    is_part and (checkpoint == 0 or _part_start(name) >= checkpoint)
+                ):
+                    os.remove(os.path.join(output_dir, name))
+
+    def _merge_stats(self, combined_stats: Counter, batch_stats):
+        """Sum numeric stats; non-numeric stats keep the last reported value"""
+        if isinstance(batch_stats, tuple):
+            # Positional deltas in the plugin's STATS_FIELDS order
+            for key, value in zip(self._stats_fields, batch_stats):
+                combined_stats[key] += value
+            return
+
+        numeric_stats = {}
+        for key, value in batch_stats.items():
+            if isinstance(value, (int, float)):
+                numeric_stats[key] = value
+            else:
+                combined_stats[key] = value
+        combined_stats.update(numeric_stats)
+
+    def _read_checkpoint(self) -> Tuple[int, Optional[int]]:
+        """Read checkpoint, return (processed line count, byte offset or None)"""
         if os.path.exists(self.checkpoint_file):
             try:
                 with open(self.checkpoint_file, "r") as f:
-                    checkpoint = int(f.read().strip())
+                    fields = f.read().strip().split(",")
+                checkpoint = int(fields[0])
+                byte_offset = int(fields[1]) if len(fields) > 1 else None
                 self.logger.info(f"Resuming from checkpoint: {checkpoint} lines")
-                return checkpoint
+                return checkpoint, byte_offset
             except Exception as e:
                 self.logger.warning(f"Failed to read checkpoint: {e}")
-        return 0
+        return 0, None
 
     def _process_ordered(
-        self, output_files, combined_stats, checkpoint, start_time, get_time
+        self,
+        pool,
+        output,
+        combined_stats,
+        checkpoint,
+        checkpoint_offset,
+        start_time,
+        get_time,
     ):
         """Process while maintaining input order"""
-        data_iter = self._iter_data(checkpoint)
-        batch_iter = self._create_batches(data_iter, self.batch_size)
+        cursor = _BatchCursor(
+            self._iter_batches(checkpoint, checkpoint_offset),
+            checkpoint,
+            self._batch_offsets,
+            self._shm_names,
+        )
 
         total_processed = 0
         total_output = 0
         last_log_time = start_time
         last_processed = 0
 
-        # For ordered processing, we need to buffer and sort results
-        pending_results = {}  # idx -> (result_data, output_idx)
-        next_write_idx = checkpoint
-
-        def batch_with_args():
-            for batch in batch_iter:
-                yield (
-                    batch,
-                    self.plugin_name,
-                    self.plugin_dir,
-                    self.output_paths,
-                    True,
+        # Batches are numbered on dispatch; results of batches that finish
+        # early are buffered until all preceding batches have been written
+        pending_batches = {}  # seq -> (chunks, num_output)
+        next_seq = 0
+
+        for (
+            seq,
+            chunks,
+            batch_stats,
+            num_input,
+            num_output,
+            warnings,
+        ) in _imap_bounded(
+            pool,
+            process_batch_worker,
+            cursor,
+            _PREFETCH_PER_WORKER * self.num_workers,
+        ):
+            cursor.returned(seq)
+            pending_batches[seq] = (chunks, num_output)
+
+            # Write completed batches in dispatch order
+            while next_seq in pending_batches:
+                chunks, num_output = pending_batches.pop(next_seq)
+                output.submit(chunks)
+                total_output += num_output
+                self._advance_checkpoint(cursor, next_seq)
+                next_seq += 1
+
+            total_processed += num_input
+
+            self._merge_stats(combined_stats, batch_stats)
+            for message in warnings:
+                self.logger.warning(message)
+
+            # Log every 10 seconds
+            current_time = get_time()
+            if current_time - last_log_time >= 10:
+                speed = (total_processed - last_processed) / (
+                    current_time - last_log_time
                 )
-
-        with Pool(processes=self.num_workers) as pool:
-            for results, batch_stats in pool.imap_unordered(
-                process_batch_worker, batch_with_args()
-            ):
-                # Buffer results
-                for idx, result_data, output_idx in results:
-                    pending_results[idx] = (result_data, output_idx)
-
-                # Write results in order
-                while next_write_idx in pending_results:
-                    result_data, output_idx = pending_results.pop(next_write_idx)
-                    if self.file_type == "jsonl":
-                        output_files[output_idx].write(
-                            json.dumps(result_data, ensure_ascii=False) + "\n"
-                        )
-                    else:
-                        output_files[output_idx].append(result_data)
-                    total_output += 1
-                    next_write_idx += 1
-
-                total_processed += self.batch_size
-
-                # Update stats
-                for key, value in batch_stats.items():
-                    if isinstance(value, (int, float)):
-                        combined_stats[key] += value
-
-                # Log every 10 seconds
-                current_time = get_time()
-                if current_time - last_log_time >= 10:
-                    speed = (total_processed - last_processed) / (
-                        current_time - last_log_time
-                    )
-                    self.logger.info(
-                        f"Speed: {speed:.0f} rows/s | Processed: {total_processed} | "
-                        f"Output: {total_output} | Pending: {len(pending_results)}"
-                    )
-                    last_log_time = current_time
-                    last_processed = total_processed
-
-        # Write any remaining buffered results
-        for idx in sorted(pending_results.keys()):
-            result_data, output_idx = pending_results[idx]
-            if self.file_type == "jsonl":
-                output_files[output_idx].write(
-                    json.dumps(result_data, ensure_ascii=False) + "\n"
+                self.logger.info(
+                    f"Speed: {speed:.0f} rows/s | Processed: {total_processed} | "
+                    f"Output: {total_output} | Pending batches: {len(pending_batches)}"
                 )
-            else:
-                output_files[output_idx].append(result_data)
-            total_output += 1
+                last_log_time = current_time
+                last_processed = total_processed
 
         combined_stats["total_processed"] = total_processed
         combined_stats["total_output"] = total_output
@@ -476,13 +1506,46 @@ def main():
         "--type", required=True, choices=["jsonl", "parquet"], help="File type"
     )
     parser.add_argument(
-        "--workers", type=int, default=4, help="Number of worker processes"
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of available CPUs)",
     )
     parser.add_argument(
         "--keep-order", action="store_true", help="Maintain input order in output"
     )
     parser.add_argument(
-        "--batch-size", type=int, default=1000, help="Batch size for processing"
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Batch size for processing (default: sized to ~4MB per batch)",
+    )
+    parser.add_argument(
+        "--shared-memory",
+        action="store_true",
+        help="Pass batches to workers via shared memory instead of pickling",
+    )
+    parser.add_argument(
+        "--sharded-output",
+        action="store_true",
+        help="Treat output paths as directories; workers write part files directly",
+    )
+    parser.add_argument(
+        "--pin-workers",
+        action="store_true",
+        help="Pin each worker process to its own CPU",
+    )
+    parser.add_argument(
+        "--row-group-size",
+        type=int,
+        default=_PARQUET_ROW_GROUP_SIZE,
+        help="Rows per parquet output row group; bounds buffered output per path",
+    )
+    parser.add_argument(
+        "--column-types",
+        type=parse_column_types,
+        default=None,
+        help="Parquet output column types, e.g. score:int32,value:float32",
     )
 
     args = parser.parse_args()
@@ -498,6 +1561,11 @@ def main():
             keep_order=args.keep_order,
             plugin_dir=args.plugin_dir,
             batch_size=args.batch_size,
+            use_shared_memory=args.shared_memory,
+            sharded_output=args.sharded_output,
+            pin_workers=args.pin_workers,
+            row_group_size=args.row_group_size,
+            column_types=args.column_types,
         )
         processor.process()
     except Exception as e:
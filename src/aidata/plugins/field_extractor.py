@@ -10,46 +10,92 @@ from aidata.plugins.plugin import Plugin
 class Field_extractor(Plugin):
     """字段提取插件"""
 
+    STATS_FIELDS = ("total_processed", "extracted", "skipped")
+
     def __init__(self):
         super().__init__()
-        self.stats["total_processed"] = 0
-        self.stats["extracted"] = 0
-        self.stats["skipped"] = 0
+        self.reset_stats()
         # 要提取的字段列表
         self.fields_to_extract = ["id", "name", "value", "timestamp"]
 
+    @property
+    def fields_to_extract(self) -> List[str]:
+        return self._fields_to_extract
+
+    @fields_to_extract.setter
+    def fields_to_extract(self, fields: List[str]):
+        self._fields_to_extract = fields
+        # Rebuilt on first use, so subclasses may reassign or extend the list
+        # after super().__init__()
+        self._accessors = None
+
+    def _build_accessors(
+        self,
+    ) -> Tuple[Tuple[str, str, Optional[Tuple[str, ...]]], ...]:
+        """预先拆分嵌套路径，避免逐行做字符串判断和 split"""
+        self._accessors = tuple(
+            (
+                field,
+                field.replace(".", "_"),
+                tuple(field.split(".")) if "." in field else None,
+            )
+            for field in self._fields_to_extract
+        )
+        return self._accessors
+
     def single_line_process(
         self, line: Dict[str, Any], output_paths: List[str]
     ) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
         """
         提取指定字段
         """
-        self.stats["total_processed"] += 1
+        self._total_processed += 1
 
         result = {}
         extracted_count = 0
 
-        for field in self.fields_to_extract:
+        accessors = self._accessors
+        if accessors is None:
+            accessors = self._build_accessors()
+
+        for field, nested_key, keys in accessors:
             if field in line:
                 result[field] = line[field]
                 extracted_count += 1
-            elif "." in field:
+            elif keys is not None:
                 # 支持嵌套字段如 "user.name"
-                value = self._get_nested(line, field)
+                value = self._get_nested_keys(line, keys)
                 if value is not None:
-                    result[field.replace(".", "_")] = value
+                    result[nested_key] = value
                     extracted_count += 1
 
         if extracted_count == 0:
-            self.stats["skipped"] += 1
+            self._skipped += 1
             return None, None
 
-        self.stats["extracted"] += 1
+        self._extracted += 1
         return result, 0
 
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return {
+            "total_processed": self._total_processed,
+            "extracted": self._extracted,
+            "skipped": self._skipped,
+        }
+
+    def reset_stats(self):
+        """重置统计信息"""
+        self._total_processed = 0
+        self._extracted = 0
+        self._skipped = 0
+
     def _get_nested(self, data: Dict, path: str) -> Any:
         """获取嵌套字段值"""
-        keys = path.split(".")
+        return self._get_nested_keys(data, tuple(path.split(".")))
+
+    def _get_nested_keys(self, data: Dict, keys: Tuple[str, ...]) -> Any:
+        """按预先拆分的键序列获取嵌套字段值"""
         value = data
         for key in keys:
             if isinstance(value, dict) and key in value:
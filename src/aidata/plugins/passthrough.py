@@ -10,13 +10,23 @@ from aidata.plugins.plugin import Plugin
 class Passthrough(Plugin):
     """透传插件"""
 
+    STATS_FIELDS = ("total_processed",)
+
     def __init__(self):
         super().__init__()
-        self.stats["total_processed"] = 0
+        self.reset_stats()
 
     def single_line_process(
         self, line: Dict[str, Any], output_paths: List[str]
     ) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
         """直接透传数据"""
-        self.stats["total_processed"] += 1
+        self._total_processed += 1
         return line, 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return {"total_processed": self._total_processed}
+
+    def reset_stats(self):
+        """重置统计信息"""
+        self._total_processed = 0
@@ -14,6 +14,10 @@ class Plugin(ABC):
     可以在子类中定义统计变量来跟踪处理过程
     """
 
+    # 数值型统计字段（可选）。声明后工作进程按此顺序以元组回传每批增量，
+    # 主进程按位置累加，且只汇总这些字段；未声明时回传完整的统计字典
+    STATS_FIELDS: Tuple[str, ...] = ()
+
     def __init__(self):
         """初始化插件，可以在子类中定义统计变量"""
         self.stats = {}
@@ -26,7 +30,7 @@ class Plugin(ABC):
         处理单行数据
 
         Args:
-            line: 输入的一行数据，字典格式
+            line: 输入的一行数据，字典格式；每行独立解析，可直接修改后返回
             output_paths: 输出路径列表（字符串列表），用于参考
 
         Returns:
@@ -36,10 +40,39 @@ class Plugin(ABC):
         """
         pass
 
+    def process_batch(self, batch, output_paths: List[str]):
+        """
+        批量处理一个 Arrow RecordBatch（可选的向量化接口）
+
+        仅在输入为 Parquet 时调用。子类可用 pyarrow.compute 实现整批处理，
+        替代逐行的 single_line_process。默认返回 None，表示回退到逐行处理。
+
+        Args:
+            batch: 输入数据，pyarrow.RecordBatch
+            output_paths: 输出路径列表（字符串列表），用于参考
+
+        Returns:
+            元组 (处理后的 RecordBatch, 输出路径序号数组)，二者行数与输入一致
+            输出路径序号数组为 pyarrow 整数数组，null 表示舍去该行
+            返回 None 表示不支持批量处理，框架将逐行调用 single_line_process
+        """
+        return None
+
+    @staticmethod
+    def _set_column(batch, name: str, values):
+        """process_batch 辅助方法：设置或追加一列（同名列存在时覆盖）"""
+        idx = batch.schema.get_field_index(name)
+        if idx >= 0:
+            return batch.set_column(idx, name, values)
+        return batch.append_column(name, values)
+
     def get_stats(self) -> Dict[str, Any]:
         """
         获取统计信息
 
+        逐行计数的插件可以把计数器保存在实例属性中，在此处再组装成字典，
+        框架每批只调用一次，省去逐行的字典读写（参考 score_filter.py）
+
         Returns:
             统计信息字典
         """
@@ -48,4 +81,3 @@ class Plugin(ABC):
     def reset_stats(self):
         """重置统计信息"""
         self.stats = {}
-
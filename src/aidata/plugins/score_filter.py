@@ -6,15 +6,25 @@
 from typing import Dict, Any, Optional, List, Tuple
 from aidata.plugins.plugin import Plugin
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
 
 class Score_filter(Plugin):
     """分数过滤插件"""
 
+    STATS_FIELDS = ("total_processed", "passed", "failed")
+
+    # 0-100 分对应的等级查找表，下标为截断后的整数分数
+    _GRADE_TABLE = "F" * 60 + "D" * 10 + "C" * 10 + "B" * 10 + "A" * 11
+
     def __init__(self):
         super().__init__()
-        self.stats["total_processed"] = 0
-        self.stats["passed"] = 0
-        self.stats["failed"] = 0
+        self.reset_stats()
 
     def single_line_process(
         self, line: Dict[str, Any], output_paths: List[str]
@@ -29,33 +39,88 @@ class Score_filter(Plugin):
         Returns:
             (处理后数据, 输出路径序号) 或 (None, None)
         """
-        self.stats["total_processed"] += 1
+        self._total_processed += 1
 
         score = line.get("score", 0)
-        result = line.copy()
 
         if score >= 60:
-            result["status"] = "passed"
-            result["grade"] = self._get_grade(score)
-            self.stats["passed"] += 1
-            return result, 0  # 输出到第一个文件
+            line["status"] = "passed"
+            # score >= 60 here, so only the upper bound needs clamping
+            line["grade"] = self._GRADE_TABLE[int(min(score, 100))]
+            self._passed += 1
+            return line, 0  # 输出到第一个文件
         else:
-            result["status"] = "failed"
-            result["grade"] = "F"
-            self.stats["failed"] += 1
+            line["status"] = "failed"
+            line["grade"] = "F"
+            self._failed += 1
             # 如果有第二个输出文件，输出到那里；否则丢弃
             if len(output_paths) > 1:
-                return result, 1  # 输出到第二个文件
+                return line, 1  # 输出到第二个文件
             return None, None  # 丢弃
 
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return {
+            "total_processed": self._total_processed,
+            "passed": self._passed,
+            "failed": self._failed,
+        }
+
+    def reset_stats(self):
+        """重置统计信息"""
+        self._total_processed = 0
+        self._passed = 0
+        self._failed = 0
+
+    def process_batch(self, batch, output_paths: List[str]):
+        """
+        向量化版本：用 Arrow 计算内核整批比较分数并计算等级
+        """
+        scores = self._score_column(batch)
+        if scores is None:
+            return None  # 非数值列或存在 null，回退到逐行处理
+
+        passed = pc.greater_equal(scores, 60)
+        grades = pc.if_else(
+            pc.greater_equal(scores, 90),
+            "A",
+            pc.if_else(
+                pc.greater_equal(scores, 80),
+                "B",
+                pc.if_else(
+                    pc.greater_equal(scores, 70),
+                    "C",
+                    pc.if_else(passed, "D", "F"),
+                ),
+            ),
+        )
+        statuses = pc.if_else(passed, "passed", "failed")
+        failed_idx = pa.scalar(1 if len(output_paths) > 1 else None, pa.int64())
+        output_indices = pc.if_else(passed, pa.scalar(0, pa.int64()), failed_idx)
+
+        num_passed = pc.sum(passed).as_py() or 0
+        self._total_processed += batch.num_rows
+        self._passed += num_passed
+        self._failed += batch.num_rows - num_passed
+
+        result = self._set_column(batch, "status", statuses)
+        result = self._set_column(result, "grade", grades)
+        return result, output_indices
+
+    @staticmethod
+    def _score_column(batch):
+        """取分数列，缺失列视为 0；非数值列或含 null 时返回 None"""
+        if "score" not in batch.schema.names:
+            return pa.repeat(pa.scalar(0, pa.int64()), batch.num_rows)
+        column = batch.column("score")
+        if not (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)):
+            return None
+        if column.null_count:
+            return None
+        return column
+
     def _get_grade(self, score: float) -> str:
         """根据分数返回等级"""
-        if score >= 90:
-            return "A"
-        elif score >= 80:
-            return "B"
-        elif score >= 70:
-            return "C"
-        elif score >= 60:
-            return "D"
-        return "F"
+        if not score >= 60:
+            return "F"
+        return self._GRADE_TABLE[int(min(score, 100))]
@@ -6,16 +6,22 @@
 from typing import Dict, Any, Optional, List, Tuple
 from aidata.plugins.plugin import Plugin
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
 
 class Text_length_filter(Plugin):
     """文本长度过滤插件"""
 
+    STATS_FIELDS = ("total_processed", "short", "medium", "long")
+
     def __init__(self):
         super().__init__()
-        self.stats["total_processed"] = 0
-        self.stats["short"] = 0
-        self.stats["medium"] = 0
-        self.stats["long"] = 0
+        self.reset_stats()
         self.min_length = 10
         self.max_length = 1000
 
@@ -30,7 +36,7 @@ class Text_length_filter(Plugin):
         - 1: 中等文本 (100-500字符)
         - 2: 长文本 (>500字符)
         """
-        self.stats["total_processed"] += 1
+        self._total_processed += 1
 
         text = line.get("text", "") or line.get("content", "") or ""
         length = len(text)
@@ -43,18 +49,93 @@ class Text_length_filter(Plugin):
         if length > self.max_length:
             return None, None
 
-        result = line.copy()
-        result["text_length"] = length
+        line["text_length"] = length
 
         if length < 100:
-            result["length_category"] = "short"
-            self.stats["short"] += 1
-            return result, 0
+            line["length_category"] = "short"
+            self._short += 1
+            return line, 0
         elif length < 500:
-            result["length_category"] = "medium"
-            self.stats["medium"] += 1
-            return result, min(1, len(output_paths) - 1)
+            line["length_category"] = "medium"
+            self._medium += 1
+            return line, min(1, len(output_paths) - 1)
         else:
-            result["length_category"] = "long"
-            self.stats["long"] += 1
-            return result, min(2, len(output_paths) - 1)
+            line["length_category"] = "long"
+            self._long += 1
+            return line, min(2, len(output_paths) - 1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return {
+            "total_processed": self._total_processed,
+            "short": self._short,
+            "medium": self._medium,
+            "long": self._long,
+        }
+
+    def reset_stats(self):
+        """重置统计信息"""
+        self._total_processed = 0
+        self._short = 0
+        self._medium = 0
+        self._long = 0
+
+    def process_batch(self, batch, output_paths: List[str]):
+        """
+        向量化版本：用 Arrow 计算内核整批计算文本长度并分类
+        """
+        text_lengths = self._column_lengths(batch, "text")
+        content_lengths = self._column_lengths(batch, "content")
+        if text_lengths is None or content_lengths is None:
+            return None  # 非字符串列，回退到逐行处理
+
+        # 等价于 line.get("text") or line.get("content") or ""
+        lengths = pc.if_else(pc.greater(text_lengths, 0), text_lengths, content_lengths)
+
+        keep = pc.and_(
+            pc.greater_equal(lengths, self.min_length),
+            pc.less_equal(lengths, self.max_length),
+        )
+        is_short = pc.and_(keep, pc.less(lengths, 100))
+        is_medium = pc.and_(
+            keep, pc.and_(pc.greater_equal(lengths, 100), pc.less(lengths, 500))
+        )
+        is_long = pc.and_(keep, pc.greater_equal(lengths, 500))
+
+        last_idx = len(output_paths) - 1
+        null_idx = pa.scalar(None, pa.int64())
+        output_indices = pc.if_else(
+            is_short,
+            0,
+            pc.if_else(
+                is_medium,
+                min(1, last_idx),
+                pc.if_else(is_long, min(2, last_idx), null_idx),
+            ),
+        )
+        categories = pc.if_else(
+            is_short, "short", pc.if_else(is_medium, "medium", "long")
+        )
+
+        self._total_processed += batch.num_rows
+        self._short += pc.sum(is_short).as_py() or 0
+        self._medium += pc.sum(is_medium).as_py() or 0
+        self._long += pc.sum(is_long).as_py() or 0
+
+        result = self._set_column(batch, "text_length", lengths)
+        result = self._set_column(result, "length_category", categories)
+        return result, output_indices
+
+    @staticmethod
+    def _column_lengths(batch, name: str):
+        """计算字符串列的字符长度，缺失列或 null 视为 0；非字符串列返回 None"""
+        if name not in batch.schema.names:
+            return pa.repeat(pa.scalar(0, pa.int64()), batch.num_rows)
+        column = batch.column(name)
+        if pa.types.is_null(column.type):
+            return pa.repeat(pa.scalar(0, pa.int64()), batch.num_rows)
+        if not (
+            pa.types.is_string(column.type) or pa.types.is_large_string(column.type)
+        ):
+            return None
+        return pc.fill_null(pc.utf8_length(column), 0).cast(pa.int64())
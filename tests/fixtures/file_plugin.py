@@ -0,0 +1,15 @@
+"""
+单元测试用的文件插件，由测试复制到 plugin_dir 后按名称加载
+"""
+
+
+class Test_plugin:
+    def __init__(self):
+        self.stats = {"count": 0}
+
+    def single_line_process(self, line, output_paths):
+        self.stats["count"] += 1
+        return line, 0
+
+    def get_stats(self):
+        return self.stats
@@ -0,0 +1,18 @@
+"""
+单元测试用的文件插件：前段行写入整数、后段行写入小数，用于检查跨行组的类型推断
+"""
+
+
+class Ratio_plugin:
+    def __init__(self):
+        self.stats = {"count": 0}
+
+    def single_line_process(self, line, output_paths):
+        self.stats["count"] += 1
+        ratio = 1 if line["id"] < 40 else 1.5
+        line["value"] = ratio
+        line["ratio"] = ratio
+        return line, 0
+
+    def get_stats(self):
+        return self.stats
@@ -2,71 +2,101 @@
 单元测试
 """
 
+import itertools
 import json
 import os
+import shutil
 import sys
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from aidata.plugins.plugin import Plugin
+from aidata.data_process import processor as processor_module
 from aidata.data_process.processor import DataProcessor
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
 
-class TestPlugin(Plugin):
-    """测试用插件"""
+# Keep test files on tmpfs where available so fixture and output I/O stays in memory
+_TMP_ROOT = (
+    "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+)
 
-    def __init__(self):
-        super().__init__()
-        self.stats["count"] = 0
+# File-based test plugin, copied into each test's plugin_dir as test_plugin.py
+_PLUGIN_FIXTURE = Path(__file__).parent / "fixtures" / "file_plugin.py"
+_RATIO_PLUGIN_FIXTURE = Path(__file__).parent / "fixtures" / "ratio_plugin.py"
 
-    def single_line_process(self, line, output_paths):
-        self.stats["count"] += 1
-        return line, 0
+
+def _write_jsonl(path, records) -> list:
+    """写出 JSONL 测试数据（一次 writev 提交全部行），返回每行的起始字节偏移"""
+    iov = [json.dumps(record).encode() + b"\n" for record in records]
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        if hasattr(os, "writev"):
+            written = os.writev(fd, iov)
+        else:
+            written = os.write(fd, b"".join(iov))
+    finally:
+        os.close(fd)
+    offsets = [0, *itertools.accumulate(map(len, iov))]
+    assert written == offsets[-1], "short write"
+    return offsets[:-1]
+
+
+def _shm_segments() -> set:
+    """列出 /dev/shm 中 multiprocessing.shared_memory 创建的段"""
+    if not os.path.isdir("/dev/shm"):
+        return set()
+    return {name for name in os.listdir("/dev/shm") if name.startswith("psm_")}
 
 
 class TestDataProcessor(unittest.TestCase):
     """DataProcessor 单元测试"""
 
+    @classmethod
+    def setUpClass(cls):
+        # Canonical input is built once and copied per test
+        cls._template_dir = tempfile.mkdtemp(dir=_TMP_ROOT)
+        cls._template_input = os.path.join(cls._template_dir, "input_100.jsonl")
+
+        _write_jsonl(
+            cls._template_input, ({"id": i, "value": i * 2} for i in range(100))
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._template_dir, ignore_errors=True)
+
     def setUp(self):
-        self.test_dir = tempfile.mkdtemp()
+        self.test_dir = tempfile.mkdtemp(dir=_TMP_ROOT)
         self.input_file = os.path.join(self.test_dir, "input.jsonl")
         self.output_file = os.path.join(self.test_dir, "output.jsonl")
         self.stats_file = os.path.join(self.test_dir, "stats.json")
 
         # Create test plugin file
         self.plugin_file = os.path.join(self.test_dir, "test_plugin.py")
-        with open(self.plugin_file, "w") as f:
-            f.write(
-                """
-from typing import Dict, Any, Optional, List, Tuple
-
-class Test_plugin:
-    def __init__(self):
-        self.stats = {'count': 0}
-    
-    def single_line_process(self, line, output_paths):
-        self.stats['count'] += 1
-        return line, 0
-    
-    def get_stats(self):
-        return self.stats
-"""
-            )
+        shutil.copyfile(_PLUGIN_FIXTURE, self.plugin_file)
 
     def tearDown(self):
-        import shutil
-
         shutil.rmtree(self.test_dir, ignore_errors=True)
 
+    def _copy_template_input(self, num_lines: int = 100):
+        """Copy the first num_lines records of the canonical input"""
+        with open(self._template_input, "rb") as src:
+            with open(self.input_file, "wb") as dst:
+                dst.writelines(itertools.islice(src, num_lines))
+
     def test_simple_processing(self):
         """测试简单数据处理"""
         # Create input data
-        with open(self.input_file, "w") as f:
-            for i in range(100):
-                f.write(json.dumps({"id": i, "value": i * 2}) + "\n")
+        self._copy_template_input()
 
         processor = DataProcessor(
             input_path=self.input_file,
@@ -82,19 +112,20 @@ class Test_plugin:
         processor.process()
 
         # Verify output
-        output_count = 0
-        with open(self.output_file, "r") as f:
-            for line in f:
-                output_count += 1
+        with open(self.output_file, "rb") as f:
+            output_count = f.read().count(b"\n")
 
         self.assertEqual(output_count, 100)
 
+        # Plugin instances are reused across batches; stats must not double count
+        with open(self.stats_file, "r") as f:
+            stats = json.load(f)
+        self.assertEqual(stats["count"], 100)
+
     def test_keep_order(self):
         """测试保持顺序"""
         # Create input data
-        with open(self.input_file, "w") as f:
-            for i in range(50):
-                f.write(json.dumps({"id": i}) + "\n")
+        self._copy_template_input(50)
 
         processor = DataProcessor(
             input_path=self.input_file,
@@ -118,6 +149,500 @@ class Test_plugin:
 
         self.assertEqual(ids, list(range(50)))
 
+    def test_keep_order_with_filtered_rows(self):
+        """测试插件丢弃部分行时仍保持顺序"""
+        _write_jsonl(
+            self.input_file, ({"id": i, "score": (i * 37) % 100} for i in range(200))
+        )
+
+        processor = DataProcessor(
+            input_path=self.input_file,
+            output_paths=[self.output_file],
+            stats_path=self.stats_file,
+            plugin_name="score_filter",
+            file_type="jsonl",
+            num_workers=3,
+            keep_order=True,
+            batch_size=7,
+        )
+        processor.process()
+
+        with open(self.output_file, "r") as f:
+            ids = [json.loads(line)["id"] for line in f]
+
+        expected = [i for i in range(200) if (i * 37) % 100 >= 60]
+        self.assertEqual(ids, expected)
+
+        # The last batch is short; processed counts must reflect real input rows
+        with open(self.stats_file, "r") as f:
+            stats = json.load(f)
+        self.assertEqual(stats["total_processed"], 200)
+        self.assertEqual(stats["total_output"], len(expected))
+
+    def test_sharded_output(self):
+        """测试分片输出：工作进程直接写 part 文件，文件名顺序即输入顺序"""
+        self._copy_template_input()
+
+        output_dir = os.path.join(self.test_dir, "sharded")
+        processor = DataProcessor(
+            input_path=self.input_file,
+            output_paths=[output_dir],
+            stats_path=self.stats_file,
+            plugin_name="test_plugin",
+            file_type="jsonl",
+            num_workers=2,
+            plugin_dir=self.test_dir,
+            batch_size=30,
+            sharded_output=True,
+        )
+        processor.process()
+
+        part_names = sorted(os.listdir(output_dir))
+        self.assertEqual(len(part_names), 4)
+        ids = []
+        for name in part_names:
+            with open(os.path.join(output_dir, name), "r") as f:
+                ids.extend(json.loads(line)["id"] for line in f)
+        self.assertEqual(ids, list(range(100)))
+
+    def test_sharded_checkpoint_resume(self):
+        """测试分片输出写检查点（行号与字节偏移），并能从检查点继续处理"""
+        line_offsets = _write_jsonl(self.input_file, ({"id": i} for i in range(100)))
+
+        output_dir = os.path.join(self.test_dir, "sharded")
+        kwargs = dict(
+            input_path=self.input_file,
+            output_paths=[output_dir],
+            stats_path=self.stats_file,
+            plugin_name="test_plugin",
+            file_type="jsonl",
+            num_workers=2,
+            plugin_dir=self.test_dir,
+            batch_size=10,
+            sharded_output=True,
+        )
+
+        # Checkpoints follow the completed prefix and are dropped once done
+        processor = DataProcessor(**kwargs)
+        written = []
+        processor._write_checkpoint = lambda *args: written.append(args)
+        with mock.patch.object(processor_module, "_CHECKPOINT_INTERVAL", 0):
+            processor.process()
+        self.assertTrue(written)
+        self.assertEqual(written, sorted(written))
+        for line, offset in written:
+            self.assertTrue(line % 10 == 0 and 0 < line < 100)
+            self.assertEqual(offset, line_offsets[line])
+        self.assertFalse(os.path.exists(processor.checkpoint_file))
+
+        # Resume: rows before the checkpoint are neither reprocessed nor lost
+        for name in os.listdir(output_dir):
+            if name >= "part-000000000060":
+                os.remove(os.path.join(output_dir, name))
+        with open(processor.checkpoint_file, "w") as f:
+            f.write(f"60,{line_offsets[60]}\n")
+        DataProcessor(**kwargs).process()
+
+        ids = []
+        for name in sorted(os.listdir(output_dir)):
+            with open(os.path.join(output_dir, name), "r") as f:
+                ids.extend(json.loads(line)["id"] for line in f)
+        self.assertEqual(ids, list(range(100)))
+        with open(self.stats_file, "r") as f:
+            self.assertEqual(json.load(f)["count"], 40)
+        self.assertFalse(os.path.exists(processor.checkpoint_file))
+
+    def test_sharded_resume_with_new_batch_size(self):
+        """测试续跑时批大小变化：检查点之后的旧分片被删除，不产生重复数据"""
+        self._copy_template_input()
+        output_dir = os.path.join(self.test_dir, "sharded")
+        kwargs = dict(
+            input_path=self.input_file,
+            output_paths=[output_dir],
+            stats_path=self.stats_file,
+            plugin_name="test_plugin",
+            file_type="jsonl",
+            num_workers=2,
+            plugin_dir=self.test_dir,
+            sharded_output=True,
+        )
+        processor = DataProcessor(batch_size=10, **kwargs)
+        processor.process()
+
+        # Every old part is still present, as if the run died after writing them
+        with open(processor.checkpoint_file, "w") as f:
+            f.write("40\n")
+        DataProcessor(batch_size=15, **kwargs).process()
+
+        ids = []
+        for name in sorted(os.listdir(output_dir)):
+            with open(os.path.join(output_dir, name), "r") as f:
+                ids.extend(json.loads(line)["id"] for line in f)
+        self.assertEqual(ids, list(range(100)))
+
+    @unittest.skipIf(
+        sys.version_info < (3, 13), "SharedMemory(track=False) requires Python 3.13"
+    )
+    def test_jsonl_shared_memory_ring(self):
+        """测试 JSONL 共享内存环形槽位：批次多于槽位时槽位循环复用，保序且不泄漏共享内存"""
+        self._copy_template_input()
+        segments_before = _shm_segments()
+
+        processor = DataProcessor(
+            input_path=self.input_file,
+            output_paths=[self.output_file],
+            stats_path=self.stats_file,
+            plugin_name="test_plugin",
+            file_type="jsonl",
+            num_workers=2,
+            keep_order=True,
+            plugin_dir=self.test_dir,
+            batch_size=5,
+            use_shared_memory=True,
+        )
+        put = processor_module._ShmRing.put
+        payloads = []
+
+        def spy_put(ring, data):
+            payload = put(ring, data)
+            payloads.append(payload)
+            return payload
+
+        with mock.patch.object(processor_module._ShmRing, "put", spy_put):
+            processor.process()
+
+        # Every batch went through the ring, so slots were released and reused
+        num_slots = processor_module._PREFETCH_PER_WORKER * 2
+        self.assertEqual(len(payloads), 20)
+        self.assertGreater(len(payloads), num_slots)
+        self.assertNotIn(None, payloads)
+        self.assertEqual(len({p[0] for p in payloads}), 1)
+
+        with open(self.output_file, "r") as f:
+            ids = [json.loads(line)["id"] for line in f]
+        self.assertEqual(ids, list(range(100)))
+        with open(self.stats_file, "r") as f:
+            self.assertEqual(json.load(f)["total_processed"], 100)
+        self.assertEqual(_shm_segments() - segments_before, set())
+
+    @unittest.skipIf(pa is None, "pyarrow not installed")
+    def test_parquet_process_batch(self):
+        """测试 Parquet 输入走插件的向量化 process_batch"""
+        input_file = os.path.join(self.test_dir, "input.parquet")
+        output_files = [
+            os.path.join(self.test_dir, f"output_{i}.parquet") for i in range(3)
+        ]
+        texts = ["x" * 5, "x" * 50, None, "x" * 200, "x" * 800, "x" * 2000]
+        rows = [{"id": i, "text": t, "content": "y" * 60} for i, t in enumerate(texts)]
+        pq.write_table(pa.Table.from_pylist(rows), input_file)
+
+        processor = DataProcessor(
+            input_path=input_file,
+            output_paths=output_files,
+            stats_path=self.stats_file,
+            plugin_name="text_length_filter",
+            file_type="parquet",
+            num_workers=2,
+            keep_order=True,
+        )
+        processor.process()
+
+        outputs = [pq.read_table(path).to_pylist() for path in output_files]
+        self.assertEqual([r["id"] for r in outputs[0]], [1, 2])
+        self.assertEqual([r["id"] for r in outputs[1]], [3])
+        self.assertEqual([r["id"] for r in outputs[2]], [4])
+        self.assertEqual(outputs[0][1]["text_length"], 60)
+        self.assertEqual(outputs[2][0]["length_category"], "long")
+
+    @unittest.skipIf(pa is None, "pyarrow not installed")
+    def test_parquet_streaming_row_groups(self):
+        """测试 Parquet 输出按行组流式写出"""
+        input_file = os.path.join(self.test_dir, "input.parquet")
+        output_file = os.path.join(self.test_dir, "output.parquet")
+        rows = [{"id": i, "name": f"n{i}"} for i in range(95)]
+        pq.write_table(pa.Table.from_pylist(rows), input_file)
+
+        processor = DataProcessor(
+            input_path=input_file,
+            output_paths=[output_file],
+            stats_path=self.stats_file,
+            plugin_name="passthrough",
+            file_type="parquet",
+            num_workers=2,
+            keep_order=True,
+            batch_size=10,
+            row_group_size=30,
+        )
+        processor.process()
+
+        parquet_file = pq.ParquetFile(output_file)
+        self.assertEqual(parquet_file.metadata.num_row_groups, 4)
+        self.assertEqual(parquet_file.read().to_pylist(), rows)
+
+    @unittest.skipIf(pa is None, "pyarrow not installed")
+    def test_parquet_null_leading_row_group(self):
+        """测试首个行组中全为 null 的列：输出 schema 沿用输入列类型"""
+        input_file = os.path.join(self.test_dir, "input.parquet")
+        output_file = os.path.join(self.test_dir, "output.parquet")
+        rows = [{"id": i, "s": None if i < 50 else "x"} for i in range(100)]
+        pq.write_table(pa.Table.from_pylist(rows), input_file)
+
+        processor = DataProcessor(
+            input_path=input_file,
+            output_paths=[output_file],
+            stats_path=self.stats_file,
+            plugin_name="passthrough",
+            file_type="parquet",
+            num_workers=2,
+            keep_order=True,
+            batch_size=10,
+            row_group_size=20,
+        )
+        processor.process()
+
+        table = pq.read_table(output_file)
+        self.assertEqual(table.schema.field("s").type, pa.string())
+        self.assertEqual(table.to_pylist(), rows)
+
+    @unittest.skipIf(pa is None, "pyarrow not installed")
+    def test_parquet_row_path_int_to_float(self):
+        """测试逐行路径中整数后出现小数：输入列沿用输入类型，新增列需用 column_types 固定"""
+        input_file = os.path.join(self.test_dir, "input.parquet")
+        output_file = os.path.join(self.test_dir, "output.parquet")
+        rows = [{"id": i, "value": i * 0.5} for i in range(100)]
+        pq.write_table(pa.Table.from_pylist(rows), input_file)
+        shutil.copyfile(
+            _RATIO_PLUGIN_FIXTURE, os.path.join(self.test_dir, "ratio_plugin.py")
+        )
+        kwargs = dict(
+            input_path=input_file,
+            output_paths=[output_file],
+            stats_path=self.stats_file,
+            plugin_name="ratio_plugin",
+            file_type="parquet",
+            num_workers=2,
+            keep_order=True,
+            plugin_dir=self.test_dir,
+            batch_size=10,
+            row_group_size=20,
+        )
+
+        # The first row groups infer int64 for the plugin-added column
+        with self.assertRaisesRegex(ValueError, "'ratio'.*--column-types ratio:"):
+            DataProcessor(**kwargs).process()
+
+        DataProcessor(column_types={"ratio": "float64"}, **kwargs).process()
+        table = pq.read_table(output_file)
+        self.assertEqual(table.schema.field("value").type, pa.float64())
+        self.assertEqual(table.schema.field("ratio").type, pa.float64())
+        expected = [1.0 if i < 40 else 1.5 for i in range(100)]
+        self.assertEqual(table.column("value").to_pylist(), expected)
+        self.assertEqual(table.column("ratio").to_pylist(), expected)
+
+    @unittest.skipIf(pa is None, "pyarrow not installed")
+    def test_parquet_score_filter_batch(self):
+        """测试分数过滤的向量化路径：单输出时不及格数据被丢弃"""
+        input_file = os.path.join(self.test_dir, "input.parquet")
+        output_file = os.path.join(self.test_dir, "output.parquet")
+        scores = [95, 59.5, 80, 60, 72, 10]
+        rows = [{"id": i, "score": s} for i, s in enumerate(scores)]
+        pq.write_table(pa.Table.from_pylist(rows), input_file)
+
+        processor = DataProcessor(
+            input_path=input_file,
+            output_paths=[output_file],
+            stats_path=self.stats_file,
+            plugin_name="score_filter",
+            file_type="parquet",
+            num_workers=2,
+            keep_order=True,
+        )
+        processor.process()
+
+        output = pq.read_table(output_file).to_pylist()
+        self.assertEqual([r["id"] for r in output], [0, 2, 3, 4])
+        self.assertEqual([r["grade"] for r in output], ["A", "B", "D", "C"])
+        with open(self.stats_file) as f:
+            stats = json.load(f)
+        self.assertEqual(stats["passed"], 4)
+        self.assertEqual(stats["failed"], 2)
+
+    @unittest.skipIf(pa is None, "pyarrow not installed")
+    def test_parquet_data_enricher_batch(self):
+        """测试数据增强的向量化路径与逐行 single_line_process 结果一致"""
+        from aidata.plugins.data_enricher import Data_enricher
+
+        input_file = os.path.join(self.test_dir, "input.parquet")
+        output_file = os.path.join(self.test_dir, "output.parquet")
+        schema = pa.schema(
+            [
+                ("id", pa.int64()),
+                ("score", pa.float64()),
+                ("flag", pa.bool_()),
+                ("count", pa.int32()),
+                ("name", pa.string()),
+            ]
+        )
+        rows = [
+            {
+                "id": None if i == 5 else i,
+                "score": None if i % 3 == 0 or i == 5 else i * 1.25,
+                "flag": None if i % 4 == 0 or i == 5 else i % 2 == 0,
+                "count": None if i % 2 or i == 5 else i * 10,
+                "name": f"n{i}",
+            }
+            for i in range(12)
+        ]
+        pq.write_table(pa.Table.from_pylist(rows, schema=schema), input_file)
+
+        processor = DataProcessor(
+            input_path=input_file,
+            output_paths=[output_file],
+            stats_path=self.stats_file,
+            plugin_name="data_enricher",
+            file_type="parquet",
+            num_workers=2,
+            keep_order=True,
+            batch_size=4,
+        )
+        processor.process()
+
+        plugin = Data_enricher()
+        expected = []
+        for row in rows:
+            result, _ = plugin.single_line_process(dict(row), [output_file])
+            del result["processed_at"]
+            # Rows without numeric values get nulls in the batch path
+            result.setdefault("numeric_sum", None)
+            result.setdefault("numeric_avg", None)
+            expected.append(result)
+
+        output = pq.read_table(output_file).to_pylist()
+        for row in output:
+            del row["processed_at"]
+        self.assertEqual(output, expected)
+        with open(self.stats_file) as f:
+            self.assertEqual(json.load(f)["enriched"], 12)
+
+    @unittest.skipIf(pa is None, "pyarrow not installed")
+    def test_parquet_data_enricher_null_leading_row_group(self):
+        """测试数据增强：首个行组数值列全为 null 时仍输出类型一致的统计列"""
+        input_file = os.path.join(self.test_dir, "input.parquet")
+        output_file = os.path.join(self.test_dir, "output.parquet")
+        schema = pa.schema([("name", pa.string()), ("v", pa.float64())])
+        rows = [{"name": f"n{i}", "v": None if i < 40 else i * 0.5} for i in range(100)]
+        pq.write_table(pa.Table.from_pylist(rows, schema=schema), input_file)
+
+        processor = DataProcessor(
+            input_path=input_file,
+            output_paths=[output_file],
+            stats_path=self.stats_file,
+            plugin_name="data_enricher",
+            file_type="parquet",
+            num_workers=2,
+            keep_order=True,
+            batch_size=10,
+            row_group_size=20,
+        )
+        processor.process()
+
+        table = pq.read_table(output_file)
+        self.assertEqual(table.schema.field("numeric_sum").type, pa.float64())
+        self.assertEqual(table.schema.field("numeric_avg").type, pa.float64())
+        output = table.to_pylist()
+        self.assertEqual([r["name"] for r in output], [r["name"] for r in rows])
+        self.assertEqual([r["numeric_sum"] for r in output], [r["v"] for r in rows])
+        self.assertEqual([r["numeric_avg"] for r in output], [r["v"] for r in rows])
+
+    @unittest.skipIf(pa is None, "pyarrow not installed")
+    @unittest.skipIf(
+        sys.version_info < (3, 13), "SharedMemory(track=False) requires Python 3.13"
+    )
+    def test_parquet_shared_memory(self):
+        """测试 Parquet 批次经共享内存传给工作进程：向量化与逐行路径结果一致且不泄漏共享内存"""
+        input_file = os.path.join(self.test_dir, "input.parquet")
+        texts = [None if i % 7 == 0 else "x" * (i * 25) for i in range(40)]
+        rows = [{"id": i, "text": t, "content": "y" * 60} for i, t in enumerate(texts)]
+        pq.write_table(pa.Table.from_pylist(rows), input_file)
+        segments_before = _shm_segments()
+
+        to_shm = processor_module._record_batch_to_shm
+        shm_names = []
+
+        def spy_to_shm(record_batch):
+            shm_names.append(to_shm(record_batch))
+            return shm_names[-1]
+
+        def run(plugin_name, output_files):
+            processor = DataProcessor(
+                input_path=input_file,
+                output_paths=output_files,
+                stats_path=self.stats_file,
+                plugin_name=plugin_name,
+                file_type="parquet",
+                num_workers=2,
+                keep_order=True,
+                batch_size=6,
+                use_shared_memory=True,
+            )
+            processor.process()
+            # Blocks are forgotten as soon as their batch returns
+            self.assertEqual(processor._shm_names, {})
+            return [pq.read_table(path).to_pylist() for path in output_files]
+
+        with mock.patch.object(processor_module, "_record_batch_to_shm", spy_to_shm):
+            # Vectorised process_batch path
+            output_files = [
+                os.path.join(self.test_dir, f"output_{i}.parquet") for i in range(3)
+            ]
+            outputs = run("text_length_filter", output_files)
+            self.assertEqual(len(shm_names), 7)
+            lengths = [len(r["text"] or r["content"]) for r in rows]
+            expected = [
+                [r["id"] for r, n in zip(rows, lengths) if 10 <= n < 100],
+                [r["id"] for r, n in zip(rows, lengths) if 100 <= n < 500],
+                [r["id"] for r, n in zip(rows, lengths) if 500 <= n <= 1000],
+            ]
+            self.assertEqual([[r["id"] for r in out] for out in outputs], expected)
+            with open(self.stats_file) as f:
+                self.assertEqual(json.load(f)["total_processed"], 40)
+
+            # Row-by-row single_line_process path
+            shm_names.clear()
+            output_file = os.path.join(self.test_dir, "output.parquet")
+            self.assertEqual(run("passthrough", [output_file]), [rows])
+            self.assertEqual(len(shm_names), 7)
+
+        self.assertEqual(_shm_segments() - segments_before, set())
+
+    @unittest.skipIf(pa is None, "pyarrow not installed")
+    def test_parquet_column_types(self):
+        """测试 Parquet 输出按 column_types 降低数值列精度"""
+        input_file = os.path.join(self.test_dir, "input.parquet")
+        output_file = os.path.join(self.test_dir, "output.parquet")
+        rows = [{"id": i, "value": i / 4, "name": f"n{i}"} for i in range(50)]
+        pq.write_table(pa.Table.from_pylist(rows), input_file)
+
+        processor = DataProcessor(
+            input_path=input_file,
+            output_paths=[output_file],
+            stats_path=self.stats_file,
+            plugin_name="passthrough",
+            file_type="parquet",
+            num_workers=2,
+            keep_order=True,
+            batch_size=10,
+            row_group_size=20,
+            column_types={"id": "int32", "value": "float32"},
+        )
+        processor.process()
+
+        table = pq.read_table(output_file)
+        self.assertEqual(table.schema.field("id").type, pa.int32())
+        self.assertEqual(table.schema.field("value").type, pa.float32())
+        self.assertEqual(table.schema.field("name").type, pa.string())
+        self.assertEqual(table.to_pylist(), rows)
+
 
 if __name__ == "__main__":
     unittest.main()